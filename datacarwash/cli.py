@@ -63,15 +63,14 @@ def wash(input_path: str, output_path: str, config_path: Optional[str],
 @click.option('--password', '-p', required=True, type=str,
               help='Password for decryption')
 def decrypt(encrypted_file: str, output_path: str, password: str):
-    """Decrypt an encrypted file."""
-    from datacarwash.encryption import DataEncryption
+    """Decrypt an encrypted file (streamed AES-GCM .enc or legacy AES zip)."""
+    from datacarwash.components.encryption import decryption
     
     logger = setup_logger()
     logger.info(f"🔓 Decrypting {encrypted_file}...")
     
     try:
-        encryptor = DataEncryption()
-        encryptor.decrypt_file(Path(encrypted_file), Path(output_path), password)
+        decryption(Path(encrypted_file), Path(output_path), password)
         logger.info(f"✅ Decrypted to {output_path}")
     except Exception as e:
         logger.error(f"❌ Decryption failed: {e}")
@@ -2,7 +2,7 @@
 Package initialization for datacarwash components.
 """
 
-from .encryption import encryption
+from .encryption import encryption, decryption
 from .normilization import normalization
 from .deduplication import save_with_deduplication
 from .uploadfile import uploadfile, scanfile
@@ -10,6 +10,7 @@ from .key_manager import get_or_create_key, get_key_for_parent_system
 
 __all__ = [
     'encryption',
+    'decryption',
     'normalization',
     'save_with_deduplication',
     'uploadfile',
@@ -6,127 +6,293 @@ Deduplication component with smart merge logic.
 """
 
 from pathlib import Path
-import json
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import unicodedata
+import orjson
+import xxhash
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Compact UTF-8 output for machine-consumed files, numpy scalars from pandas included
+# (anything else orjson can't handle, e.g. pandas Timestamps, is written via str()).
+# Non-string keys (form_data keyed by a numeric Excel header) are written as
+# strings, like json.dump did
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+# One compact record per line (every model is stored as JSON Lines)
+JSONL_OPTIONS = JSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+
+
+def iter_records(jsonl_path: Path) -> Iterator[Dict]:
+    """Yield records from a JSON Lines file one line at a time."""
+    with open(jsonl_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield orjson.loads(line)
 
 
 def load_existing_records(json_path: Path) -> List[Dict]:
-    """Load existing JSON records if file exists."""
-    if json_path.exists():
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+    """Load existing records if file exists (JSON Lines, or a legacy JSON array)."""
+    if not json_path.exists():
+        return []
+    
+    with open(json_path, 'rb') as f:
+        is_array = f.read(64).lstrip()[:1] == b'['
+    if is_array:
+        return orjson.loads(json_path.read_bytes())
+    return list(iter_records(json_path))
+
+
+def write_records(jsonl_path: Path, records: Iterable[Dict]):
+    """
+    Rewrite a JSON Lines file, one record serialized at a time.
+    
+    Records go to a temp file that replaces jsonl_path once complete, so an
+    interrupted run never leaves a half-written file behind.
+    """
+    tmp_path = jsonl_path.with_name(jsonl_path.name + '.part')
+    with open(tmp_path, 'wb') as f:
+        write = f.write
+        for record in records:
+            write(orjson.dumps(record, default=str, option=JSONL_OPTIONS))
+    tmp_path.replace(jsonl_path)
+
+
+def append_records(jsonl_path: Path, records: Iterable[Dict]):
+    """
+    Append records to a JSON Lines file, one record per line.
+    
+    A legacy JSON array file with the same stem is converted first,
+    so history from earlier runs is kept.
+    """
+    legacy_path = jsonl_path.with_suffix('.json')
+    migrate = legacy_path.exists() and not jsonl_path.exists()
+    if migrate:
+        records = itertools.chain(load_existing_records(legacy_path), records)
+    
+    with open(jsonl_path, 'ab') as f:
+        write = f.write
+        for record in records:
+            write(orjson.dumps(record, default=str, option=JSONL_OPTIONS))
+    
+    if migrate:
+        legacy_path.unlink()
+
+
+def _norm(value: Optional[str]) -> str:
+    """Normalize a text field for matching: NFKC, lowercase, trimmed."""
+    if not value:
+        return ''
+    return unicodedata.normalize('NFKC', value).lower().strip()
+
+
+def person_fingerprint(name: str, village: str, age: Optional[int]) -> int:
+    """128-bit xxh3 fingerprint of normalized name + village + age."""
+    return xxhash.xxh3_128_intdigest(f"{name}\x1f{village}\x1f{age}".encode('utf-8'))
+
+
+def person_identity(person: Dict) -> Tuple[str, Optional[int]]:
+    """
+    Normalize a person's matching fields once.
+    
+    Returns:
+        Tuple of (registration_number, fingerprint)
+        - registration_number: Normalized, '' if missing
+        - fingerprint: person_fingerprint() of name + village + age, None if no name
+    """
+    reg_number = _norm((person.get('role_data') or {}).get('registration_number'))
+    
+    name = _norm(person.get('name'))
+    if not name:
+        return reg_number, None
+    
+    village = _norm((person.get('address') or {}).get('village'))
+    return reg_number, person_fingerprint(name, village, person.get('age'))
 
 
-def find_duplicate_person(person: Dict, existing_persons: List[Dict]) -> Optional[Dict]:
+def find_duplicate_person(
+    identity: Tuple[str, Optional[int]],
+    by_reg: Dict[str, Dict],
+    by_fp: Dict[int, Dict],
+    by_blank_village: Optional[Dict[int, Optional[Dict]]] = None
+) -> Optional[Dict]:
     """
     Find duplicate person based on matching criteria.
     
+    Args:
+        identity: person_identity() of the new person
+        by_reg: Existing persons keyed by normalized registration number
+        by_fp: Existing persons keyed by person_fingerprint()
+        by_blank_village: Existing persons with a village, keyed by their
+            village-less fingerprint (None where several share it)
+    
     Returns:
         Existing person dict if found, None otherwise
     """
-    name = person.get('name', '').lower().strip()
-    reg_number = person.get('role_data', {}).get('registration_number', '').upper().strip()
+    reg_number, fingerprint = identity
     
-    for existing in existing_persons:
-        existing_name = existing.get('name', '').lower().strip()
-        existing_reg = existing.get('role_data', {}).get('registration_number', '').upper().strip()
-        
-        # Match by registration number (strongest identifier)
-        if reg_number and existing_reg and reg_number == existing_reg:
-            return existing
-        
-        # Match by name + village + age (weaker but useful)
-        if name and existing_name and name == existing_name:
-            existing_village = existing.get('address', {}).get('village', '').lower().strip()
-            new_village = person.get('address', {}).get('village', '').lower().strip()
-            existing_age = existing.get('age')
-            new_age = person.get('age')
-            
-            if existing_village == new_village and existing_age == new_age:
-                return existing
+    # Match by registration number (strongest identifier)
+    if reg_number and reg_number in by_reg:
+        return by_reg[reg_number]
+    
+    # Match by name + village + age (weaker but useful)
+    if fingerprint is not None:
+        existing = by_fp.get(fingerprint)
+        # A row with no village matches by name + age only when exactly
+        # one known person with a village has that name and age
+        if existing is None and by_blank_village:
+            existing = by_blank_village.get(fingerprint)
+        return existing
     
     return None
 
 
-def update_person_info(existing: Dict, new: Dict) -> Dict:
+def update_person_info(existing: Dict, new: Dict, now_iso: Optional[str] = None) -> bool:
     """
-    Update existing person with new information.
+    Update existing person in place with new information.
     Only updates if new data is more complete or different.
+    
+    Args:
+        existing: Existing person record (mutated)
+        new: New person record
+        now_iso: Timestamp for updated_at (default: now)
+    
+    Returns:
+        True if any field changed (updated_at is only bumped then)
     """
-    updated = existing.copy()
+    changed = False
+    new_contact = new.get('contact') or {}
+    new_address = new.get('address') or {}
+    new_role_data = new.get('role_data') or {}
     
     # Update contact if new data exists
-    if new.get('contact', {}).get('phone_primary'):
-        updated['contact']['phone_primary'] = new['contact']['phone_primary']
-    if new.get('contact', {}).get('phone_secondary'):
-        updated['contact']['phone_secondary'] = new['contact']['phone_secondary']
+    if new_contact:
+        contact = existing.setdefault('contact', {})
+        for field in ('phone_primary', 'phone_secondary'):
+            value = new_contact.get(field)
+            if value and contact.get(field) != value:
+                contact[field] = value
+                changed = True
     
     # Update address if more complete
-    if new.get('address', {}).get('village'):
-        updated['address']['village'] = new['address']['village']
-    if new.get('address', {}).get('subcounty'):
-        updated['address']['subcounty'] = new['address']['subcounty']
-    if new.get('address', {}).get('district'):
-        updated['address']['district'] = new['address']['district']
+    if new_address:
+        address = existing.setdefault('address', {})
+        for field in ('village', 'subcounty', 'district'):
+            value = new_address.get(field)
+            if value and address.get(field) != value:
+                address[field] = value
+                changed = True
     
     # Update age if changed
-    if new.get('age') and new['age'] != existing.get('age'):
-        updated['age'] = new['age']
+    new_age = new.get('age')
+    if new_age and new_age != existing.get('age'):
+        existing['age'] = new_age
+        changed = True
     
-    # Update role_data
-    if new.get('role_data'):
-        if 'role_data' not in updated:
-            updated['role_data'] = {}
-        updated['role_data'].update(new['role_data'])
+    # Update role_data (empty values never overwrite known ones; the
+    # enrollment date is kept from the first visit)
+    if new_role_data:
+        role_data = existing.setdefault('role_data', {})
+        for key, value in new_role_data.items():
+            if not value or role_data.get(key) == value:
+                continue
+            if key == 'enrollment_date' and role_data.get(key):
+                continue
+            role_data[key] = value
+            changed = True
     
     # Update timestamp
-    updated['updated_at'] = datetime.now().isoformat()
+    if changed:
+        existing['updated_at'] = now_iso or datetime.now().isoformat()
+    
+    return changed
+
+
+def _index_person(
+    person: Dict,
+    by_reg: Dict[str, Dict],
+    by_fp: Dict[int, Dict],
+    by_blank_village: Dict[int, Optional[Dict]]
+):
+    """
+    Index person under its current reg number and fingerprint.
     
-    return updated
+    The first record to claim a key keeps it. A person with a village is
+    also indexed under the village-less fingerprint, so rows that leave
+    the village blank match the record that has it filled in, on later
+    runs the same as within the run that filled it in. That key is only
+    used while it is unambiguous: once a second person claims it (same
+    name and age, another village) it maps to None and matches nobody.
+    """
+    reg_number, fingerprint = person_identity(person)
+    if reg_number:
+        by_reg.setdefault(reg_number, person)
+    if fingerprint is not None:
+        by_fp.setdefault(fingerprint, person)
+        if _norm((person.get('address') or {}).get('village')):
+            blank_fp = person_fingerprint(_norm(person.get('name')), '', person.get('age'))
+            if blank_fp not in by_blank_village:
+                by_blank_village[blank_fp] = person
+            elif by_blank_village[blank_fp] is not person:
+                by_blank_village[blank_fp] = None
 
 
 def deduplicate_persons(new_persons: List[Dict], existing_persons: List[Dict]) -> Tuple[List[Dict], Dict[str, str]]:
     """
     Deduplicate person records with smart update logic.
     
+    Repeat rows for the same patient within new_persons are merged too:
+    each new person is indexed as soon as it is accepted, so later rows
+    match it like any existing record. Records are re-indexed after every
+    update, since a filled-in reg number or village changes how they match.
+    
     Returns:
         Tuple of (unique_persons, id_mapping)
         - unique_persons: New persons to add
-        - id_mapping: Maps new_person_id -> existing_person_id for duplicates
+        - id_mapping: Maps new_person_id -> person_id it was merged into
+          (an existing person, or the first row for that patient in this batch)
     """
     unique_persons = []
     id_mapping = {}  # new_id -> existing_id
-    updated_persons = []
     duplicate_count = 0
+    merged_count = 0
+    batch_ids = set()  # person_ids first seen in this batch
+    now_iso = datetime.now().isoformat()  # one timestamp for the whole batch
+    
+    # Index existing persons once so each lookup is O(1)
+    by_reg = {}
+    by_fp = {}
+    by_blank_village = {}
+    for existing in existing_persons:
+        _index_person(existing, by_reg, by_fp, by_blank_village)
     
     for person in new_persons:
-        existing = find_duplicate_person(person, existing_persons)
+        existing = find_duplicate_person(person_identity(person), by_reg, by_fp, by_blank_village)
         
         if existing:
-            # DUPLICATE FOUND - Update info, map IDs
-            duplicate_count += 1
             id_mapping[person['person_id']] = existing['person_id']
+            if existing['person_id'] in batch_ids:
+                # REPEAT ROW - same patient earlier in this file
+                merged_count += 1
+            else:
+                # DUPLICATE FOUND - Update info, map IDs
+                duplicate_count += 1
+                print(f"⚠️  Duplicate found: {person['name']} - updating info, will create new encounter")
             
-            # Update existing person with new info
-            updated = update_person_info(existing, person)
-            updated_persons.append(updated)
-            
-            print(f"⚠️  Duplicate found: {person['name']} - updating info, will create new encounter")
+            # Update existing person in place with new info
+            if update_person_info(existing, person, now_iso):
+                _index_person(existing, by_reg, by_fp, by_blank_village)
         else:
-            # NEW PERSON
+            # NEW PERSON - indexed so later rows in this batch match it
             unique_persons.append(person)
-    
-    # Update existing persons list with updates
-    for updated in updated_persons:
-        for i, existing in enumerate(existing_persons):
-            if existing['person_id'] == updated['person_id']:
-                existing_persons[i] = updated
-                break
+            batch_ids.add(person['person_id'])
+            _index_person(person, by_reg, by_fp, by_blank_village)
     
     if duplicate_count > 0:
         print(f"✅ Updated {duplicate_count} existing person records")
+    if merged_count > 0:
+        print(f"🔁 Merged {merged_count} repeat rows into patients from this batch")
     
     return unique_persons, id_mapping
 
@@ -140,10 +306,10 @@ def remap_ids(records: List[Dict], id_mapping: Dict[str, str], field_name: str =
         id_mapping: Dictionary mapping new_id -> existing_id
         field_name: Name of field to remap (patient_id, person_id, etc.)
     """
+    lookup = id_mapping.get
     for record in records:
-        if record.get(field_name) in id_mapping:
-            old_id = record[field_name]
-            record[field_name] = id_mapping[old_id]
+        old_id = record.get(field_name)
+        record[field_name] = lookup(old_id, old_id)
 
 
 def save_with_deduplication(
@@ -153,27 +319,32 @@ def save_with_deduplication(
     treatments: List[Dict],
     diseases: List[Dict],
     medical_records: List[Dict],
-    output_path: Path
+    output_path: Path,
+    on_saved: Optional[Callable[[Path], None]] = None
 ):
     """
     Save all records with smart deduplication:
-    - Persons: UPDATE if duplicate
+    All models are stored as JSON Lines (<model>.jsonl)
+    - Persons: UPDATE if duplicate (persons.jsonl, rewritten)
+    - Events below are appended
     - Encounters: Always CREATE (new visit)
     - Observations: Always CREATE (time-series)
     - Treatments: Always CREATE (new prescriptions)
     - Diseases: CREATE if different diagnosis
     - Medical_Records: Always CREATE (new notes)
+    
+    on_saved, if given, is called with each file's path as soon as that
+    file is complete (from a writer thread), e.g. to start encrypting it
+    while the other files are still being written.
     """
     
     output_path.mkdir(parents=True, exist_ok=True)
     
-    # Load existing records
-    existing_persons = load_existing_records(output_path / "persons.json")
-    existing_encounters = load_existing_records(output_path / "encounters.json")
-    existing_observations = load_existing_records(output_path / "observations.json")
-    existing_treatments = load_existing_records(output_path / "treatments.json")
-    existing_diseases = load_existing_records(output_path / "diseases.json")
-    existing_medical_records = load_existing_records(output_path / "medical_records.json")
+    # Load existing persons (events are append-only and never re-read);
+    # fall back to the persons.json array written by older versions
+    persons_path = output_path / "persons.jsonl"
+    legacy_persons_path = persons_path.with_suffix('.json')
+    existing_persons = load_existing_records(persons_path if persons_path.exists() else legacy_persons_path)
     
     # Deduplicate persons and get ID mapping
     unique_persons, id_mapping = deduplicate_persons(persons, existing_persons)
@@ -181,46 +352,40 @@ def save_with_deduplication(
     # Remap IDs in related records
     if id_mapping:
         print(f"🔗 Remapping IDs for {len(id_mapping)} duplicate persons...")
-        remap_ids(encounters, id_mapping, 'patient_id')
-        remap_ids(observations, id_mapping, 'patient_id')
-        remap_ids(treatments, id_mapping, 'patient_id')
-        remap_ids(diseases, id_mapping, 'patient_id')
-        remap_ids(medical_records, id_mapping, 'patient_id')
+        for records in (encounters, observations, treatments, diseases, medical_records):
+            remap_ids(records, id_mapping, 'patient_id')
     
     # Merge: Persons (only unique ones - duplicates already updated in existing_persons)
     all_persons = existing_persons + unique_persons
     
-    # Merge: Everything else (always append - these are time-series/events)
-    all_encounters = existing_encounters + encounters
-    all_observations = existing_observations + observations
-    all_treatments = existing_treatments + treatments
-    all_diseases = existing_diseases + diseases
-    all_medical_records = existing_medical_records + medical_records
-    
-    # Save all files
-    with open(output_path / "persons.json", 'w', encoding='utf-8') as f:
-        json.dump(all_persons, f, indent=2, ensure_ascii=False)
-    
-    with open(output_path / "encounters.json", 'w', encoding='utf-8') as f:
-        json.dump(all_encounters, f, indent=2, ensure_ascii=False)
-    
-    with open(output_path / "observations.json", 'w', encoding='utf-8') as f:
-        json.dump(all_observations, f, indent=2, ensure_ascii=False)
-    
-    with open(output_path / "treatments.json", 'w', encoding='utf-8') as f:
-        json.dump(all_treatments, f, indent=2, ensure_ascii=False)
-    
-    with open(output_path / "diseases.json", 'w', encoding='utf-8') as f:
-        json.dump(all_diseases, f, indent=2, ensure_ascii=False)
+    # Save: persons are rewritten (updates allowed); everything else is
+    # appended - these are time-series/events, so each run writes only
+    # its new records
+    def save(write, path: Path, records: List[Dict]):
+        write(path, records)
+        if on_saved:
+            on_saved(path)
     
-    with open(output_path / "medical_records.json", 'w', encoding='utf-8') as f:
-        json.dump(all_medical_records, f, indent=2, ensure_ascii=False)
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        futures = [
+            executor.submit(save, write_records, persons_path, all_persons),
+            executor.submit(save, append_records, output_path / "encounters.jsonl", encounters),
+            executor.submit(save, append_records, output_path / "observations.jsonl", observations),
+            executor.submit(save, append_records, output_path / "treatments.jsonl", treatments),
+            executor.submit(save, append_records, output_path / "diseases.jsonl", diseases),
+            executor.submit(save, append_records, output_path / "medical_records.jsonl", medical_records)
+        ]
+        for future in futures:
+            future.result()
+    legacy_persons_path.unlink(missing_ok=True)
     
     # Summary
     print(f"\n📊 Summary:")
-    print(f"   Persons: {len(unique_persons)} new, {len(id_mapping)} updated (total: {len(all_persons)})")
-    print(f"   Encounters: {len(encounters)} new (total: {len(all_encounters)})")
-    print(f"   Observations: {len(observations)} new (total: {len(all_observations)})")
-    print(f"   Treatments: {len(treatments)} new (total: {len(all_treatments)})")
-    print(f"   Diseases: {len(diseases)} new (total: {len(all_diseases)})")
-    print(f"   Medical Records: {len(medical_records)} new (total: {len(all_medical_records)})")
+    new_ids = {person['person_id'] for person in unique_persons}
+    merged = sum(1 for person_id in id_mapping.values() if person_id in new_ids)
+    print(f"   Persons: {len(unique_persons)} new, {len(id_mapping) - merged} updated, {merged} repeat rows merged (total: {len(all_persons)})")
+    print(f"   Encounters: {len(encounters)} new (appended)")
+    print(f"   Observations: {len(observations)} new (appended)")
+    print(f"   Treatments: {len(treatments)} new (appended)")
+    print(f"   Diseases: {len(diseases)} new (appended)")
+    print(f"   Medical Records: {len(medical_records)} new (appended)")
@@ -1,22 +1,226 @@
+"""
+Encryption component.
+- Default: streaming AES-256-GCM (OpenSSL, uses AES-NI where available)
+- Legacy: WinZip AES zip archives via pyzipper (legacy_zip=True, stored uncompressed)
+
+Streamed file layout:
+    MAGIC | version | flags | salt (16) | nonce (12) | ciphertext | tag (16)
+The header is authenticated as associated data. With FLAG_DEFLATE set the
+plaintext is zlib-compressed before encryption.
+"""
+
 from pathlib import Path
-import pyzipper 
 import os
+import queue
+import shutil
+import threading
+import zipfile
+import zlib
+import pyzipper
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 
 
+MAGIC = b"DCWE"
+VERSION = 1
+SALT_SIZE = 16
+NONCE_SIZE = 12
+TAG_SIZE = 16
+HEADER_SIZE = len(MAGIC) + 2 + SALT_SIZE + NONCE_SIZE
+CHUNK_SIZE = 1 << 20  # 1 MiB
+QUEUE_DEPTH = 4  # chunks in flight per pipeline stage
+POLL_INTERVAL = 0.05  # seconds between stop checks while a pipeline stage waits
+FLAG_DEFLATE = 0x01  # ciphertext holds a raw zlib stream
+COMPRESSION_LEVEL = 1  # ~2x faster than 6 on our JSON Lines for ~15% larger output
 
 
+def derive_key(password: str, salt: bytes) -> bytes:
+    """Derive a 256-bit AES key from the password with scrypt."""
+    kdf = Scrypt(salt=salt, length=32, n=2**14, r=8, p=1)
+    return kdf.derive(password.encode('utf-8'))
 
-def encryption ( input_path: Path, output_path: Path, password: str):
 
-    if input_path.suffix in ['.json']:
-        with pyzipper.AESZipFile(output_path, 'w', compression=pyzipper.ZIP_DEFLATED,encryption=pyzipper.WZ_AES) as zipf:
-                zipf.setpassword(password.encode('utf-8'))
-                zipf.writestr(input_path.name, input_path.read_bytes())
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Put item on q, giving up (False) once stop is set."""
+    while True:
+        try:
+            q.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            if stop.is_set():
+                return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Get the next item from q, or None once stop is set."""
+    while True:
+        try:
+            return q.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if stop.is_set():
+                return None
+
+
+def _encrypt_pipelined(src, dst, encryptor, compress: bool):
+    """
+    Read -> (deflate +) encrypt -> write, with each stage on its own thread.
+
+    Stages are connected by bounded queues (QUEUE_DEPTH chunks), so disk
+    reads and writes overlap with compression/encryption while memory stays
+    capped. zlib, OpenSSL and file I/O all release the GIL. Every queue
+    wait polls the stop event, so the producers exit on their own when the
+    writer fails.
+    """
+    raw = queue.Queue(maxsize=QUEUE_DEPTH)
+    sealed = queue.Queue(maxsize=QUEUE_DEPTH)
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        try:
+            while not stop.is_set():
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk or not _put(raw, chunk, stop):
+                    break
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            _put(raw, None, stop)
+
+    def seal():
+        compressor = zlib.compressobj(COMPRESSION_LEVEL) if compress else None
+        try:
+            while (chunk := _get(raw, stop)) is not None:
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                if chunk and not _put(sealed, encryptor.update(chunk), stop):
+                    return
+            if stop.is_set():
+                return
+            if compressor:
+                _put(sealed, encryptor.update(compressor.flush()), stop)
+            _put(sealed, encryptor.finalize(), stop)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            _put(sealed, None, stop)
+
+    threads = [threading.Thread(target=read, daemon=True), threading.Thread(target=seal, daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while (block := sealed.get()) is not None:
+            dst.write(block)
+    finally:
+        # Stop the producers if anything went wrong downstream
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def encryption ( input_path: Path, output_path: Path, password: str, legacy_zip: bool = False, compress: bool = True):
+
+    if input_path.suffix in ['.json', '.jsonl']:
+        if legacy_zip:
+            with pyzipper.AESZipFile(output_path, 'w', compression=pyzipper.ZIP_STORED,encryption=pyzipper.WZ_AES) as zipf:
+                    zipf.setpassword(password.encode('utf-8'))
+                    # Stream into the archive instead of materializing the whole file
+                    large = input_path.stat().st_size >= zipfile.ZIP64_LIMIT
+                    with open(input_path, 'rb') as src, zipf.open(input_path.name, 'w', force_zip64=large) as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            return True
+
+        salt = os.urandom(SALT_SIZE)
+        nonce = os.urandom(NONCE_SIZE)
+        flags = FLAG_DEFLATE if compress else 0
+        header = MAGIC + bytes([VERSION, flags]) + salt + nonce
+
+        encryptor = Cipher(algorithms.AES(derive_key(password, salt)), modes.GCM(nonce)).encryptor()
+        encryptor.authenticate_additional_data(header)
+
+        with open(input_path, 'rb') as src, open(output_path, 'wb') as dst:
+            dst.write(header)
+            _encrypt_pipelined(src, dst, encryptor, compress)
+            dst.write(encryptor.tag)
         return True
 
     else:
-        raise ValueError(f"Unsupported file type for encryption: {input_path.suffix}") 
+        raise ValueError(f"Unsupported file type for encryption: {input_path.suffix}")
+
+
+def decryption(input_path: Path, output_path: Path, password: str) -> Path:
+    """
+    Decrypt a file produced by encryption() (streamed AES-GCM or legacy zip).
+
+    Args:
+        input_path: Encrypted file
+        output_path: Where to write the decrypted JSON / JSON Lines file
+        password: Encryption key used by the pipeline
+
+    Returns:
+        Path to decrypted file
+
+    Raises:
+        cryptography.exceptions.InvalidTag: If password is wrong or data was tampered with
+    """
+    with open(input_path, 'rb') as src:
+        header = src.read(HEADER_SIZE)
+
+        if not header.startswith(MAGIC):
+            # Legacy pyzipper archive holding a single JSON file
+            with pyzipper.AESZipFile(input_path, 'r') as zipf:
+                zipf.setpassword(password.encode('utf-8'))
+                output_path.write_bytes(zipf.read(zipf.namelist()[0]))
+            return output_path
+
+        if header[len(MAGIC)] != VERSION:
+            raise ValueError(f"Unsupported encrypted file version: {header[len(MAGIC)]}")
+        decompressor = zlib.decompressobj() if header[len(MAGIC) + 1] & FLAG_DEFLATE else None
+
+        salt = header[-(SALT_SIZE + NONCE_SIZE):-NONCE_SIZE]
+        nonce = header[-NONCE_SIZE:]
+        remaining = input_path.stat().st_size - HEADER_SIZE - TAG_SIZE
+        if remaining < 0:
+            raise ValueError(f"Truncated encrypted file: {input_path}")
+
+        src.seek(HEADER_SIZE + remaining)
+        tag = src.read(TAG_SIZE)
+        src.seek(HEADER_SIZE)
 
+        decryptor = Cipher(algorithms.AES(derive_key(password, salt)), modes.GCM(nonce, tag)).decryptor()
+        decryptor.authenticate_additional_data(header)
 
+        # Write to a temp file so unauthenticated plaintext never lands at output_path
+        tmp_path = output_path.with_name(output_path.name + '.part')
+        inflate_error = None
+        try:
+            with open(tmp_path, 'wb') as dst:
+                while remaining > 0:
+                    chunk = src.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ValueError(f"Truncated encrypted file: {input_path}")
+                    remaining -= len(chunk)
+                    chunk = decryptor.update(chunk)
+                    if inflate_error:
+                        continue
+                    try:
+                        dst.write(decompressor.decompress(chunk) if decompressor else chunk)
+                    except zlib.error as e:
+                        # Keep authenticating so tampering surfaces as InvalidTag
+                        inflate_error = e
+                chunk = decryptor.finalize()
+                if inflate_error:
+                    raise inflate_error
+                if decompressor:
+                    chunk = decompressor.decompress(chunk) + decompressor.flush()
+                dst.write(chunk)
+            tmp_path.replace(output_path)
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
 
-    
\ No newline at end of file
+    return output_path
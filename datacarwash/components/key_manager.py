@@ -4,12 +4,18 @@ Generates cryptographically secure encryption keys.
 Parent system retrieves key programmatically (never human-readable).
 """
 
+import functools
+import re
 import secrets
-import base64
 from pathlib import Path
 from typing import Optional
 
 
+# First non-empty ENCRYPTION_KEY assignment, and any ENCRYPTION_KEY line
+_KEY_RE = re.compile(rb'^[ \t]*ENCRYPTION_KEY=[ \t]*(\S+)', re.M)
+_KEY_LINE_RE = re.compile(rb'^[ \t]*ENCRYPTION_KEY=.*\n?', re.M)
+
+
 def generate_bank_level_key(bits: int = 256) -> str:
     """
     Generate bank-level cryptographically secure key.
@@ -18,15 +24,10 @@ def generate_bank_level_key(bits: int = 256) -> str:
         bits: Key strength in bits (default 256-bit = AES-256 strength)
         
     Returns:
-        Base64-encoded random key (not human-readable)
+        Hex-encoded random key (not human-readable)
     """
-    # Generate random bytes
-    key_bytes = secrets.token_bytes(bits // 8)
-    
-    # Encode as base64 for storage
-    key_b64 = base64.b64encode(key_bytes).decode('utf-8')
-    
-    return key_b64
+    # Generate random bytes, hex-encoded for storage in one C call
+    return secrets.token_hex(bits // 8)
 
 
 def get_or_create_key(env_path: Path = None) -> tuple[str, bool]:
@@ -38,7 +39,7 @@ def get_or_create_key(env_path: Path = None) -> tuple[str, bool]:
         
     Returns:
         Tuple of (key, is_new)
-        - key: The encryption key (base64-encoded)
+        - key: The encryption key (hex-encoded)
         - is_new: True if newly generated, False if loaded
     """
     if env_path is None:
@@ -58,21 +59,29 @@ def get_or_create_key(env_path: Path = None) -> tuple[str, bool]:
     
     print(f"✅ Generated 256-bit cryptographically secure key")
     print(f"🏦 Bank-level security: Key saved to .env")
-    print(f"⚠️  Key is NOT human-readable (base64-encoded random bytes)")
+    print(f"⚠️  Key is NOT human-readable (hex-encoded random bytes)")
     
     return key, True
 
 
 def load_key_from_env(env_path: Path) -> Optional[str]:
-    """Load encryption key from .env file."""
+    """Load encryption key from .env file (cached until the file changes)."""
+    try:
+        stat = env_path.stat()
+    except Exception as e:
+        print(f"⚠️  Error reading .env: {e}")
+        return None
+    
+    return _load_key_cached(str(env_path), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_key_cached(env_path: str, mtime_ns: int, size: int) -> Optional[str]:
+    """Parse .env once per (path, mtime, size); edits invalidate the cache."""
     try:
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith('ENCRYPTION_KEY='):
-                    key = line.split('=', 1)[1].strip()
-                    if key:
-                        return key
+        match = _KEY_RE.search(Path(env_path).read_bytes())
+        if match:
+            return match.group(1).decode('utf-8')
     except Exception as e:
         print(f"⚠️  Error reading .env: {e}")
     
@@ -86,26 +95,27 @@ def save_key_to_env(key: str, env_path: Path):
     # Read existing content
     existing_lines = []
     if env_path.exists():
-        with open(env_path, 'r') as f:
-            existing_lines = [line for line in f if not line.strip().startswith('ENCRYPTION_KEY=')]
+        other_vars = _KEY_LINE_RE.sub(b'', env_path.read_bytes()).decode('utf-8')
+        existing_lines = [line.strip() for line in other_vars.splitlines()]
     
-    # Write back with new key
-    with open(env_path, 'w') as f:
+    # Write back with new key (built in memory, written in one call)
+    parts = [
         # Add security header
-        f.write("# TORORO HOSPICE ENCRYPTION KEY\n")
-        f.write("# WARNING: This file contains cryptographically secure keys\n")
-        f.write("# NEVER commit this file to version control\n")
-        f.write("# NEVER share this file via insecure channels\n")
-        f.write("# Parent system accesses this key programmatically\n\n")
+        "# TORORO HOSPICE ENCRYPTION KEY\n",
+        "# WARNING: This file contains cryptographically secure keys\n",
+        "# NEVER commit this file to version control\n",
+        "# NEVER share this file via insecure channels\n",
+        "# Parent system accesses this key programmatically\n\n",
         
         # Add key
-        f.write(f"ENCRYPTION_KEY={key}\n")
-        f.write("\n")
-        
-        # Write other existing variables
-        for line in existing_lines:
-            if line.strip() and not line.strip().startswith('#'):
-                f.write(f"{line}\n")
+        f"ENCRYPTION_KEY={key}\n",
+        "\n",
+    ]
+    
+    # Write other existing variables
+    parts.extend(f"{line}\n" for line in existing_lines if line and not line.startswith('#'))
+    
+    env_path.write_text("".join(parts))
 
 
 def get_key_for_parent_system() -> str:
@@ -114,7 +124,7 @@ def get_key_for_parent_system() -> str:
     Parent system calls this function to get the key programmatically.
     
     Returns:
-        Encryption key (base64-encoded)
+        Encryption key (hex-encoded)
         
     Raises:
         RuntimeError: If key doesn't exist
@@ -142,71 +152,74 @@ def export_key_metadata(output_path: Path):
     """
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(output_path, 'w') as f:
-        f.write("=" * 70 + "\n")
-        f.write("TORORO HOSPICE ENCRYPTION KEY - PARENT SYSTEM INTERFACE\n")
-        f.write("=" * 70 + "\n\n")
+    lines = [
+        "=" * 70 + "\n",
+        "TORORO HOSPICE ENCRYPTION KEY - PARENT SYSTEM INTERFACE\n",
+        "=" * 70 + "\n\n",
         
-        f.write("SECURITY NOTICE:\n")
-        f.write("-" * 70 + "\n")
-        f.write("This system uses bank-level cryptographic security.\n")
-        f.write("The encryption key is:\n")
-        f.write("  - 256-bit AES strength\n")
-        f.write("  - Generated using Python secrets module\n")
-        f.write("  - NOT human-readable (base64-encoded random bytes)\n")
-        f.write("  - Stored in .env file (git-ignored)\n\n")
+        "SECURITY NOTICE:\n",
+        "-" * 70 + "\n",
+        "This system uses bank-level cryptographic security.\n",
+        "The encryption key is:\n",
+        "  - 256-bit AES strength\n",
+        "  - Generated using Python secrets module\n",
+        "  - NOT human-readable (hex-encoded random bytes)\n",
+        "  - Stored in .env file (git-ignored)\n\n",
         
-        f.write("PARENT SYSTEM INTEGRATION:\n")
-        f.write("-" * 70 + "\n")
-        f.write("To retrieve the encryption key programmatically:\n\n")
+        "PARENT SYSTEM INTEGRATION:\n",
+        "-" * 70 + "\n",
+        "To retrieve the encryption key programmatically:\n\n",
         
-        f.write("Option 1: Python API (Recommended)\n")
-        f.write("```python\n")
-        f.write("from datacarwash.components.key_manager import get_key_for_parent_system\n\n")
-        f.write("# Parent system retrieves key\n")
-        f.write("encryption_key = get_key_for_parent_system()\n")
-        f.write("```\n\n")
+        "Option 1: Python API (Recommended)\n",
+        "```python\n",
+        "from datacarwash.components.key_manager import get_key_for_parent_system\n\n",
+        "# Parent system retrieves key\n",
+        "encryption_key = get_key_for_parent_system()\n",
+        "```\n\n",
         
-        f.write("Option 2: Environment Variable\n")
-        f.write("```python\n")
-        f.write("import os\n")
-        f.write("from pathlib import Path\n\n")
-        f.write("# Load .env file\n")
-        f.write("env_path = Path('path/to/.env')\n")
-        f.write("with open(env_path, 'r') as f:\n")
-        f.write("    for line in f:\n")
-        f.write("        if line.startswith('ENCRYPTION_KEY='):\n")
-        f.write("            key = line.split('=', 1)[1].strip()\n")
-        f.write("```\n\n")
+        "Option 2: Environment Variable\n",
+        "```python\n",
+        "import os\n",
+        "from pathlib import Path\n\n",
+        "# Load .env file\n",
+        "env_path = Path('path/to/.env')\n",
+        "with open(env_path, 'r') as f:\n",
+        "    for line in f:\n",
+        "        if line.startswith('ENCRYPTION_KEY='):\n",
+        "            key = line.split('=', 1)[1].strip()\n",
+        "```\n\n",
         
-        f.write("Option 3: Shared Secret System (Production)\n")
-        f.write("For production deployment, consider:\n")
-        f.write("  - AWS Secrets Manager\n")
-        f.write("  - HashiCorp Vault\n")
-        f.write("  - Azure Key Vault\n")
-        f.write("  - Google Secret Manager\n\n")
+        "Option 3: Shared Secret System (Production)\n",
+        "For production deployment, consider:\n",
+        "  - AWS Secrets Manager\n",
+        "  - HashiCorp Vault\n",
+        "  - Azure Key Vault\n",
+        "  - Google Secret Manager\n\n",
         
-        f.write("DECRYPTION EXAMPLE:\n")
-        f.write("-" * 70 + "\n")
-        f.write("```python\n")
-        f.write("import pyzipper\n")
-        f.write("from datacarwash.components.key_manager import get_key_for_parent_system\n\n")
-        f.write("# Get key from datacarwash system\n")
-        f.write("key = get_key_for_parent_system()\n\n")
-        f.write("# Decrypt file\n")
-        f.write("with pyzipper.AESZipFile('persons.zip', 'r') as zipf:\n")
-        f.write("    zipf.setpassword(key.encode('utf-8'))\n")
-        f.write("    data = zipf.read('persons.json')\n")
-        f.write("```\n\n")
+        "DECRYPTION EXAMPLE:\n",
+        "-" * 70 + "\n",
+        "```python\n",
+        "from pathlib import Path\n",
+        "from datacarwash.components.encryption import decryption\n",
+        "from datacarwash.components.key_manager import get_key_for_parent_system\n\n",
+        "# Get key from datacarwash system\n",
+        "key = get_key_for_parent_system()\n\n",
+        "# Decrypt file (streamed AES-256-GCM; legacy .zip files also accepted)\n",
+        "decryption(Path('persons.jsonl.enc'), Path('persons.jsonl'), key)\n",
+        "```\n\n",
         
-        f.write("SECURITY BEST PRACTICES:\n")
-        f.write("-" * 70 + "\n")
-        f.write("1. Access .env file via secure filesystem permissions (chmod 600)\n")
-        f.write("2. Use encrypted filesystems for production storage\n")
-        f.write("3. Rotate keys periodically (re-encrypt with new key)\n")
-        f.write("4. Log key access for audit trails\n")
-        f.write("5. Never log or display the actual key value\n\n")
+        "SECURITY BEST PRACTICES:\n",
+        "-" * 70 + "\n",
+        "1. Access .env file via secure filesystem permissions (chmod 600)\n",
+        "2. Use encrypted filesystems for production storage\n",
+        "3. Rotate keys periodically (re-encrypt with new key)\n",
+        "4. Log key access for audit trails\n",
+        "5. Never log or display the actual key value\n\n",
         
-        f.write("=" * 70 + "\n")
+        "=" * 70 + "\n",
+    ]
+    
+    # One write for the whole document instead of one per line
+    output_path.write_text("".join(lines))
     
     print(f"📋 Key metadata exported to: {output_path}")
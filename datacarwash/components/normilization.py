@@ -2,256 +2,539 @@ from pathlib import Path
 import pandas as pd
 import json
 from datetime import datetime
-import uuid
-from typing import Dict, List, Optional
+import os
+import importlib.util
+from typing import Callable, Dict, List, Optional, Tuple
 from .deduplication import save_with_deduplication
 
+# Optional faster readers (pip install pyarrow python-calamine)
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
 
-def normalization(input_path: Path, output_path: Path) -> Path:
+
+# Every Kobo submission comes from the Tororo hospice
+DEFAULT_DISTRICT = "tororo"
+DEFAULT_COUNTRY = "uganda"
+
+
+# Columns with few distinct values; read as 'category' so cleaning runs once
+# per distinct value instead of once per row
+CATEGORICAL_COLUMNS = [
+    'sex', 'village', 'general_assessment', 'cachexia', 'jaundice',
+    'pallor', 'body_wasting', 'loc', 'orientation'
+]
+
+# pandas' default NA markers for read_csv; pyarrow's own list lacks 'None' and '<NA>'
+PANDAS_NA_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None',
+    'n/a', 'nan', 'null'
+]
+
+# calamine (Rust) reads .xlsx/.xls several times faster than openpyxl/xlrd;
+# pandas only accepts engine='calamine' from 2.2 on
+_PANDAS_VERSION = tuple(int(part) for part in pd.__version__.split('.')[:2])
+EXCEL_ENGINE = (
+    'calamine'
+    if _PANDAS_VERSION >= (2, 2) and importlib.util.find_spec('python_calamine')
+    else None
+)
+
+
+# Byte tables forcing the RFC 4122 version (4) and variant (10xx) bits
+_UUID_VERSION = bytes((b & 0x0f) | 0x40 for b in range(256))
+_UUID_VARIANT = bytes((b & 0x3f) | 0x80 for b in range(256))
+
+
+def _uuid4_batch(count: int) -> List[str]:
+    """
+    Generate count random (version 4) UUID strings from a single os.urandom call.
+    
+    Same format and randomness as str(uuid.uuid4()), without a syscall and
+    UUID object per id.
+    """
+    if count <= 0:
+        return []
+    raw = bytearray(os.urandom(16 * count))
+    raw[6::16] = raw[6::16].translate(_UUID_VERSION)
+    raw[8::16] = raw[8::16].translate(_UUID_VARIANT)
+    digits = raw.hex()
+    return [
+        f"{digits[j:j + 8]}-{digits[j + 8:j + 12]}-{digits[j + 12:j + 16]}-{digits[j + 16:j + 20]}-{digits[j + 20:j + 32]}"
+        for j in range(0, 32 * count, 32)
+    ]
+
+
+# orjson only serializes integers that fit in 64 bits
+_JSON_INT_RANGE = range(-2**63, 2**64)
+
+
+def _column_list(series: pd.Series) -> List:
+    """
+    Column as a list of Python values.
+    
+    pandas keeps integers wider than 64 bits (e.g. a 20-digit ID) as Python
+    ints in an object column; those become strings so the record can be saved.
+    """
+    values = series.tolist()
+    if series.dtype == object:
+        values = [
+            str(value) if type(value) is int and value not in _JSON_INT_RANGE else value
+            for value in values
+        ]
+    return values
+
+
+def _present(values: List) -> List[Tuple[int, object]]:
+    """(row position, value) pairs for the values that are not None."""
+    return [(i, value) for i, value in enumerate(values) if value is not None]
+
+
+def _read_csv(input_path: Path) -> pd.DataFrame:
+    """
+    Read a CSV with pyarrow's multi-threaded parser when installed.
+    
+    Values come out as pandas' own parser would give them: pandas' NA
+    markers (empty, 'None', 'NA', ...) are missing, and columns pyarrow
+    would infer as dates, times or timestamps are read as text, so
+    form_data keeps what was in the file ("08:30" stays "08:30").
+    Floating-point columns are read as text and parsed by pandas, which
+    also takes signed integers ("+256772123456") as int64. The types come
+    from the first block, which is what read_csv infers from too.
+    """
+    if pa_csv is None:
+        return pd.read_csv(input_path)
+    options = {'null_values': PANDAS_NA_VALUES, 'strings_can_be_null': True}
+    try:
+        with pa_csv.open_csv(input_path, convert_options=pa_csv.ConvertOptions(**options)) as reader:
+            schema = reader.schema
+        numeric = [field.name for field in schema if pa.types.is_floating(field.type)]
+        as_text = {
+            field.name: pa.string() for field in schema
+            if pa.types.is_temporal(field.type) or pa.types.is_floating(field.type)
+        }
+        table = pa_csv.read_csv(input_path, convert_options=pa_csv.ConvertOptions(column_types=as_text, **options))
+    except pa.ArrowInvalid:
+        # e.g. a column whose type changes after the first block
+        return pd.read_csv(input_path)
+    if len(set(table.column_names)) != table.num_columns:
+        return pd.read_csv(input_path)  # pandas de-duplicates repeated headers
+    df = table.to_pandas()
+    try:
+        for column in numeric:
+            df[column] = pd.to_numeric(df[column])
+    except ValueError:
+        return pd.read_csv(input_path)  # text further down a numeric column
+    return df
+
+
+def _values(df: pd.DataFrame, column: str) -> List:
+    """Column as a list of Python values, None where missing (or column absent)."""
+    if column not in df:
+        return [None] * len(df)
+    series = df[column]
+    return _column_list(series.astype(object).where(series.notna(), None))
+
+
+def _clean_text(df: pd.DataFrame, column: str, case: Optional[str] = None) -> List[Optional[str]]:
+    """
+    Vectorized str(value).strip() for a whole column, None where missing.
+    
+    Args:
+        df: Input DataFrame
+        column: Column to clean
+        case: 'lower', 'upper' or None to keep case
+    """
+    if column not in df:
+        return [None] * len(df)
+    series = df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Clean the distinct values, then expand them back via the codes
+        cleaned = _clean_text(pd.DataFrame({column: series.cat.categories}), column, case)
+        return [cleaned[code] if code >= 0 else None for code in series.cat.codes.tolist()]
+    text = series.astype(str).str.strip()
+    if case == 'lower':
+        text = text.str.lower()
+    elif case == 'upper':
+        text = text.str.upper()
+    return text.astype(object).where(series.notna(), None).tolist()
+
+
+def build_records(input_path: Path, keep_raw_form_data: bool = True) -> Dict[str, List[Dict]]:
     """
-    Convert Kobo Excel/CSV to separate JSON model files.
+    Read a Kobo Excel/CSV file and sort it into model records.
+    
+    Touches no output files, so several inputs can be built in parallel.
     
     Args:
         input_path: Path to Excel/CSV file
-        output_path: Directory where JSON files will be saved
+        keep_raw_form_data: Store the submission's non-empty answers in
+            encounter form_data (None when False)
         
     Returns:
-        Path to output directory
+        Dict of record lists keyed like save_with_deduplication()'s arguments
+        (persons, encounters, observations, treatments, diseases, medical_records)
     """
     
     # Step 1: Read the file
     if input_path.suffix in ['.xlsx', '.xls']:
-        df = pd.read_excel(input_path)
+        df = pd.read_excel(input_path, engine=EXCEL_ENGINE)
     elif input_path.suffix == '.csv':
-        df = pd.read_csv(input_path)
+        df = _read_csv(input_path)
     else:
         raise ValueError(f"Unsupported file type: {input_path.suffix}")
     
-    # Step 2: Initialize empty lists for each model
-    persons = []
-    encounters = []
-    observations = []
-    treatments = []
-    diseases = []
-    medical_records = []
+    # Which optional columns this export has, checked once per block below
+    available = frozenset(df.columns)
     
-    # Step 3: Loop through rows and SORT data into categories
-    for index, row in df.iterrows():
-        
-        # Generate unique IDs
-        person_id = str(uuid.uuid4())
-        encounter_id = str(uuid.uuid4())
-        
-        # CATEGORY 1: Person (demographics)
-        person = {
+    for column in CATEGORICAL_COLUMNS:
+        if column in available:
+            df[column] = df[column].astype('category')
+    
+    # Step 2: Clean each column once (vectorized), then assemble records
+    # One timestamp for the whole batch (consistent created_at/updated_at)
+    now = datetime.now()
+    now_iso = now.isoformat()
+    today = str(now.date())
+    
+    row_count = len(df)
+    person_ids = _uuid4_batch(row_count)
+    encounter_ids = _uuid4_batch(row_count)
+    
+    names = _clean_text(df, 'patient_name', 'lower')
+    ages = [int(age) if age is not None else None for age in _values(df, 'age')]
+    sexes = _clean_text(df, 'sex', 'lower')
+    phones = _values(df, 'phone')
+    villages = _clean_text(df, 'village', 'lower')
+    reg_numbers = _clean_text(df, 'reg_number', 'upper')
+    if 'assessment_date' in available:
+        encounter_dates = [str(value) for value in df['assessment_date'].tolist()]
+    else:
+        encounter_dates = [today] * row_count
+    diagnoses = _clean_text(df, 'diagnosis')
+    summaries = _clean_text(df, 'summary')
+    next_reviews = _clean_text(df, 'next_review')
+    if keep_raw_form_data:
+        # Only answered fields; unanswered ones are implied by the form
+        # Rows are zipped from per-column lists: itertuples() steps through
+        # extension (string/category) arrays one element at a time
+        columns = df.columns.tolist()
+        rows = zip(*[_column_list(df.iloc[:, j]) for j in range(len(columns))])
+        form_data = [
+            {column: value for column, value, present in zip(columns, row, answered) if present}
+            for row, answered in zip(rows, df.notna().to_numpy().tolist())
+        ]
+    else:
+        form_data = [None] * row_count
+    
+    # Step 3: SORT data into categories
+    # Each category is one comprehension over the cleaned columns
+    
+    # CATEGORY 1: Person (demographics)
+    persons = [
+        {
             "person_id": person_id,
             "person_type": "patient",
-            "name": str(row.get('patient_name', '')).strip().lower() if pd.notna(row.get('patient_name')) else None,
-            "age": int(row.get('age')) if pd.notna(row.get('age')) else None,
-            "sex": str(row.get('sex', '')).strip().lower() if pd.notna(row.get('sex')) else None,
+            "name": name,
+            "age": age,
+            "sex": sex,
             "contact": {
-                "phone_primary": row.get('phone') if pd.notna(row.get('phone')) else None,
+                "phone_primary": phone,
                 "phone_secondary": None
             },
             "address": {
-                "village": str(row.get('village', '')).strip().lower() if pd.notna(row.get('village')) else None,
+                "village": village,
                 "subcounty": None,
-                "district": "tororo",
-                "country": "uganda"
+                "district": DEFAULT_DISTRICT,
+                "country": DEFAULT_COUNTRY
             },
             "role_data": {
-                "registration_number": str(row.get('reg_number', '')).strip().upper() if pd.notna(row.get('reg_number')) else None,
-                "enrollment_date": str(row.get('assessment_date', datetime.now().date())),
+                "registration_number": reg_number,
+                "enrollment_date": encounter_date,
                 "status": "active"
             },
             "is_active": True,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
+            "created_at": now_iso,
+            "updated_at": now_iso
         }
-        persons.append(person)
-        
-        # CATEGORY 2: Encounter (visit/assessment)
-        encounter = {
+        for person_id, name, age, sex, phone, village, reg_number, encounter_date in zip(
+            person_ids, names, ages, sexes, phones, villages, reg_numbers, encounter_dates
+        )
+    ]
+    
+    # CATEGORY 2: Encounter (visit/assessment)
+    encounters = [
+        {
             "encounter_id": encounter_id,
             "patient_id": person_id,
             "encounter_type": "clinical_assessment",
-            "encounter_date": str(row.get('assessment_date', datetime.now().date())),
+            "encounter_date": encounter_date,
             "encounter_time": None,
             "duration_minutes": None,
             "staff_id": None,
             "location_type": "clinic",
             "location_details": None,
-            "chief_complaint": str(row.get('diagnosis', '')).strip() if pd.notna(row.get('diagnosis')) else None,
-            "assessment_summary": str(row.get('summary', '')).strip() if pd.notna(row.get('summary')) else None,
-            "plan": str(row.get('next_review', '')).strip() if pd.notna(row.get('next_review')) else None,
-            "next_visit_date": str(row.get('next_review', '')).strip() if pd.notna(row.get('next_review')) else None,
+            "chief_complaint": diagnosis,
+            "assessment_summary": summary,
+            "plan": next_review,
+            "next_visit_date": next_review,
             "status": "completed",
-            "form_data": row.to_dict(),
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
+            "form_data": raw,
+            "created_at": now_iso,
+            "updated_at": now_iso
         }
-        encounters.append(encounter)
-        
-        # CATEGORY 3: Observations (vitals and physical exam)
-        # Vital signs - combine into one observation
-        vitals = {}
-        if pd.notna(row.get('pulse_rate')):
-            vitals['heart_rate'] = int(row['pulse_rate'])
-        if pd.notna(row.get('bp_systol')):
-            vitals['blood_pressure_systolic'] = int(row['bp_systol'])
-        if pd.notna(row.get('bp_diastol')):
-            vitals['blood_pressure_diastolic'] = int(row['bp_diastol'])
-        if pd.notna(row.get('temperature')):
-            vitals['temperature'] = float(row['temperature'])
-        if pd.notna(row.get('resp_rate')):
-            vitals['respiratory_rate'] = int(row['resp_rate'])
-        
-        if vitals:
-            observations.append({
-                "observation_id": str(uuid.uuid4()),
-                "patient_id": person_id,
-                "encounter_id": encounter_id,
+        for encounter_id, person_id, encounter_date, diagnosis, summary, next_review, raw in zip(
+            encounter_ids, person_ids, encounter_dates, diagnoses, summaries, next_reviews, form_data
+        )
+    ]
+    
+    # CATEGORY 3: Observations (vitals and physical exam)
+    observations = []
+    
+    # Vital signs - combine into one observation, only for rows with any vital
+    vital_fields = {
+        'pulse_rate': ('heart_rate', int),
+        'bp_systol': ('blood_pressure_systolic', int),
+        'bp_diastol': ('blood_pressure_diastolic', int),
+        'temperature': ('temperature', float),
+        'resp_rate': ('respiratory_rate', int)
+    }
+    vital_columns = [column for column in vital_fields if column in available]
+    if vital_columns:
+        vital_specs = [vital_fields[column] for column in vital_columns]  # (key, cast) per column
+        vitals_df = df[vital_columns]
+        vitals_mask = vitals_df.notna()
+        has_vitals = vitals_mask.any(axis=1).to_numpy()
+        positions = has_vitals.nonzero()[0].tolist()
+        observations.extend(
+            {
+                "observation_id": observation_id,
+                "patient_id": person_ids[i],
+                "encounter_id": encounter_ids[i],
                 "observation_type": "vital_sign",
                 "observation_category": "cardiovascular",
                 "observation_name": "vital_signs",
-                "value": vitals,
-                "observation_date": encounter['encounter_date'],
-                "recorded_by": None,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            })
-        
-        # Physical exam findings - one observation per finding
-        exam_fields = {
-            'general_assessment': 'general',
-            'cachexia': 'general',
-            'jaundice': 'general',
-            'pallor': 'general',
-            'body_wasting': 'general'
-        }
-        
-        for field, category in exam_fields.items():
-            if pd.notna(row.get(field)):
-                observations.append({
-                    "observation_id": str(uuid.uuid4()),
-                    "patient_id": person_id,
-                    "encounter_id": encounter_id,
-                    "observation_type": "physical_exam_finding",
-                    "observation_category": category,
-                    "observation_name": field,
-                    "value": {"finding": str(row[field])},
-                    "observation_date": encounter['encounter_date'],
-                    "recorded_by": None,
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat()
-                })
-        
-        # Level of consciousness and orientation
-        if pd.notna(row.get('loc')):
-            observations.append({
-                "observation_id": str(uuid.uuid4()),
-                "patient_id": person_id,
-                "encounter_id": encounter_id,
-                "observation_type": "assessment_score",
-                "observation_category": "neurological",
-                "observation_name": "level_of_consciousness",
-                "value": {"level": str(row['loc'])},
-                "observation_date": encounter['encounter_date'],
+                "value": {
+                    key: cast(value)
+                    for (key, cast), value, is_present in zip(vital_specs, values, present)
+                    if is_present
+                },
+                "observation_date": encounter_dates[i],
                 "recorded_by": None,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            })
-        
-        if pd.notna(row.get('orientation')):
-            observations.append({
-                "observation_id": str(uuid.uuid4()),
-                "patient_id": person_id,
-                "encounter_id": encounter_id,
-                "observation_type": "assessment_score",
-                "observation_category": "neurological",
-                "observation_name": "orientation",
-                "value": {"status": str(row['orientation'])},
-                "observation_date": encounter['encounter_date'],
+                "created_at": now_iso,
+                "updated_at": now_iso
+            }
+            for i, observation_id, values, present in zip(
+                positions,
+                _uuid4_batch(len(positions)),
+                vitals_df[has_vitals].itertuples(index=False, name=None),
+                vitals_mask[has_vitals].itertuples(index=False, name=None)
+            )
+        )
+    
+    # Physical exam findings - one observation per finding
+    exam_fields = {
+        'general_assessment': 'general',
+        'cachexia': 'general',
+        'jaundice': 'general',
+        'pallor': 'general',
+        'body_wasting': 'general'
+    }
+    
+    exam_columns = [field for field in exam_fields if field in available]
+    if exam_columns:
+        # One long (row, field, finding) frame for all exam columns, field by
+        # field; object dtype keeps each column's own values through the melt
+        findings = (
+            df[exam_columns].astype(object).reset_index(drop=True)
+            .melt(var_name='field', value_name='finding', ignore_index=False)
+            .dropna(subset=['finding'])
+        )
+        observations.extend(
+            {
+                "observation_id": observation_id,
+                "patient_id": person_ids[i],
+                "encounter_id": encounter_ids[i],
+                "observation_type": "physical_exam_finding",
+                "observation_category": category,
+                "observation_name": field,
+                "value": {"finding": str(value)},
+                "observation_date": encounter_dates[i],
                 "recorded_by": None,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            })
-        
-        # CATEGORY 4: Disease (diagnosis)
-        if pd.notna(row.get('diagnosis')):
-            diseases.append({
-                "disease_id": str(uuid.uuid4()),
-                "patient_id": person_id,
-                "medical_record_id": None,
-                "encounter_id": encounter_id,
-                "disease_category": "unspecified",
-                "disease_name": str(row['diagnosis']).strip().lower(),
-                "icd10_code": None,
-                "disease_details": {},
-                "diagnosis_date": encounter['encounter_date'],
-                "diagnosed_by": None,
-                "status": "active",
-                "severity": None,
-                "prognosis": None,
-                "notes": None,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            })
-        
-        # CATEGORY 5: Treatments (medications)
-        # Note: Repeating groups would need separate handling
-        # For now, check if medication fields exist
-        if pd.notna(row.get('med_name')):
-            treatments.append({
-                "treatment_id": str(uuid.uuid4()),
-                "patient_id": person_id,
-                "encounter_id": encounter_id,
+                "created_at": now_iso,
+                "updated_at": now_iso
+            }
+            for i, field, category, value, observation_id in zip(
+                findings.index.tolist(),
+                findings['field'].tolist(),
+                findings['field'].map(exam_fields).tolist(),
+                findings['finding'].tolist(),
+                _uuid4_batch(len(findings))
+            )
+        )
+    
+    # Level of consciousness and orientation
+    loc_values = _present(_values(df, 'loc'))
+    observations.extend(
+        {
+            "observation_id": observation_id,
+            "patient_id": person_ids[i],
+            "encounter_id": encounter_ids[i],
+            "observation_type": "assessment_score",
+            "observation_category": "neurological",
+            "observation_name": "level_of_consciousness",
+            "value": {"level": str(value)},
+            "observation_date": encounter_dates[i],
+            "recorded_by": None,
+            "created_at": now_iso,
+            "updated_at": now_iso
+        }
+        for (i, value), observation_id in zip(loc_values, _uuid4_batch(len(loc_values)))
+    )
+    
+    orientation_values = _present(_values(df, 'orientation'))
+    observations.extend(
+        {
+            "observation_id": observation_id,
+            "patient_id": person_ids[i],
+            "encounter_id": encounter_ids[i],
+            "observation_type": "assessment_score",
+            "observation_category": "neurological",
+            "observation_name": "orientation",
+            "value": {"status": str(value)},
+            "observation_date": encounter_dates[i],
+            "recorded_by": None,
+            "created_at": now_iso,
+            "updated_at": now_iso
+        }
+        for (i, value), observation_id in zip(orientation_values, _uuid4_batch(len(orientation_values)))
+    )
+    
+    # Back to one row's observations after another (vitals, exam findings,
+    # consciousness, orientation); the sort is stable, so kind order holds
+    row_of = {encounter_id: i for i, encounter_id in enumerate(encounter_ids)}
+    observations.sort(key=lambda observation: row_of[observation['encounter_id']])
+    
+    # CATEGORY 4: Disease (diagnosis)
+    disease_names = _present(_clean_text(df, 'diagnosis', 'lower'))
+    diseases = [
+        {
+            "disease_id": disease_id,
+            "patient_id": person_ids[i],
+            "medical_record_id": None,
+            "encounter_id": encounter_ids[i],
+            "disease_category": "unspecified",
+            "disease_name": disease_name,
+            "icd10_code": None,
+            "disease_details": {},
+            "diagnosis_date": encounter_dates[i],
+            "diagnosed_by": None,
+            "status": "active",
+            "severity": None,
+            "prognosis": None,
+            "notes": None,
+            "created_at": now_iso,
+            "updated_at": now_iso
+        }
+        for (i, disease_name), disease_id in zip(disease_names, _uuid4_batch(len(disease_names)))
+    ]
+    
+    # CATEGORY 5: Treatments (medications)
+    # Note: Repeating groups would need separate handling
+    # For now, check if medication fields exist
+    treatments = []
+    if 'med_name' in available:
+        med_names = _clean_text(df, 'med_name')
+        doses = _clean_text(df, 'dose')
+        indications = _clean_text(df, 'indication')
+        end_dates = _clean_text(df, 'date_completed')
+        physician_notes = _clean_text(df, 'note_physician')
+        med_names = _present(med_names)
+        treatments = [
+            {
+                "treatment_id": treatment_id,
+                "patient_id": person_ids[i],
+                "encounter_id": encounter_ids[i],
                 "treatment_type": "medication",
-                "treatment_name": str(row['med_name']).strip(),
+                "treatment_name": med_name,
                 "treatment_category": "symptom_control",
                 "details": {
-                    "generic_name": str(row['med_name']).strip(),
-                    "dosage": str(row.get('dose', '')).strip() if pd.notna(row.get('dose')) else None,
-                    "indication": str(row.get('indication', '')).strip() if pd.notna(row.get('indication')) else None
+                    "generic_name": med_name,
+                    "dosage": doses[i],
+                    "indication": indications[i]
                 },
-                "start_date": encounter['encounter_date'],
-                "end_date": str(row.get('date_completed', '')).strip() if pd.notna(row.get('date_completed')) else None,
+                "start_date": encounter_dates[i],
+                "end_date": end_dates[i],
                 "status": "active",
-                "notes": str(row.get('note_physician', '')).strip() if pd.notna(row.get('note_physician')) else None,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            })
-        
-        # CATEGORY 6: Medical Records (clinical notes)
-        if pd.notna(row.get('summary')):
-            medical_records.append({
-                "record_id": str(uuid.uuid4()),
-                "patient_id": person_id,
-                "encounter_id": encounter_id,
+                "notes": physician_notes[i],
+                "created_at": now_iso,
+                "updated_at": now_iso
+            }
+            for (i, med_name), treatment_id in zip(med_names, _uuid4_batch(len(med_names)))
+        ]
+    
+    # CATEGORY 6: Medical Records (clinical notes)
+    medical_records = []
+    if 'summary' in available:
+        seen_by = _clean_text(df, 'seen_by')
+        notes = _present(summaries)
+        medical_records = [
+            {
+                "record_id": record_id,
+                "patient_id": person_ids[i],
+                "encounter_id": encounter_ids[i],
                 "record_type": "clinical_note",
-                "record_date": encounter['encounter_date'],
+                "record_date": encounter_dates[i],
                 "record_time": None,
                 "title": "Assessment Summary",
-                "summary": str(row['summary']).strip(),
+                "summary": summary,
                 "content": {
-                    "note": str(row['summary']).strip(),
-                    "seen_by": str(row.get('seen_by', '')).strip() if pd.notna(row.get('seen_by')) else None
+                    "note": summary,
+                    "seen_by": seen_by[i]
                 },
                 "author_id": None,
                 "status": "final",
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            })
+                "created_at": now_iso,
+                "updated_at": now_iso
+            }
+            for (i, summary), record_id in zip(notes, _uuid4_batch(len(notes)))
+        ]
+    
+    return {
+        "persons": persons,
+        "encounters": encounters,
+        "observations": observations,
+        "treatments": treatments,
+        "diseases": diseases,
+        "medical_records": medical_records
+    }
+
+
+def normalization(
+    input_path: Path,
+    output_path: Path,
+    on_saved: Optional[Callable[[Path], None]] = None,
+    keep_raw_form_data: bool = True
+) -> Path:
+    """
+    Convert Kobo Excel/CSV to separate JSON Lines model files.
+    
+    Args:
+        input_path: Path to Excel/CSV file
+        output_path: Directory where the .jsonl files will be saved
+        on_saved: Called with each .jsonl path once it is written
+        keep_raw_form_data: Store each submission's answers in encounter form_data
+        
+    Returns:
+        Path to output directory
+    """
+    # Steps 1-3: Read and sort into categories
+    records = build_records(input_path, keep_raw_form_data)
     
     # Step 4 & 5: Save with smart deduplication
-    save_with_deduplication(
-        persons=persons,
-        encounters=encounters,
-        observations=observations,
-        treatments=treatments,
-        diseases=diseases,
-        medical_records=medical_records,
-        output_path=output_path
-    )
+    save_with_deduplication(**records, output_path=output_path, on_saved=on_saved)
     
     return output_path
\ No newline at end of file
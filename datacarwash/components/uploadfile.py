@@ -1,24 +1,27 @@
 from pathlib import Path
+import os
+
+
+VALID_SUFFIXES = ('.xlsx', '.csv', '.xls')
 
 
 def uploadfile ( input_path: Path):
 
-   if input_path.exists():
-        return input_path.suffix in ['.xlsx', '.csv', '.xls']
-   else:
-        raise FileNotFoundError(f"File {input_path} does not exist.")   
+   try:
+        os.stat(input_path)
+   except FileNotFoundError:
+        raise FileNotFoundError(f"File {input_path} does not exist.") from None
+   return input_path.suffix in VALID_SUFFIXES
 
 def scanfile ( folder_path: Path):
  
-    if not folder_path.exists():
-        raise FileNotFoundError(f"Folder {folder_path} does not exist.")
-    if not folder_path.is_dir():
-        raise NotADirectoryError(f"{folder_path} is not a directory.")
-
-    valid_files = []
-
-    for item in folder_path.iterdir():
-        if item.is_file() and item.suffix in ['.xlsx', '.csv', '.xls']:
-            valid_files.append(item)
+    # One directory read; DirEntry caches the file type, so no stat per file
+    try:
+        entries = os.scandir(folder_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Folder {folder_path} does not exist.") from None
+    except NotADirectoryError:
+        raise NotADirectoryError(f"{folder_path} is not a directory.") from None
 
-    return valid_files
\ No newline at end of file
+    with entries:
+        return [Path(entry.path) for entry in entries if entry.name.endswith(VALID_SUFFIXES) and entry.is_file()]
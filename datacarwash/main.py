@@ -4,12 +4,81 @@ Bank-level secure encryption with programmatic key access for parent system.
 """
 
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+from typing import List
 from datacarwash.components.uploadfile import uploadfile, scanfile
-from datacarwash.components.normilization import normalization
+from datacarwash.components.normilization import normalization, build_records
+from datacarwash.components.deduplication import save_with_deduplication
 from datacarwash.components.encryption import encryption
 from datacarwash.components.key_manager import get_or_create_key, export_key_metadata
 
 
+def encrypt_file(json_file: Path, encrypted_dir: Path, encryption_key: str) -> Path:
+    """Encrypt one normalized .jsonl file to encrypted_dir/<name>.enc."""
+    encrypted_file = encrypted_dir / f"{json_file.name}.enc"
+    encryption(json_file, encrypted_file, encryption_key)
+    return encrypted_file
+
+
+def encrypt_normalized(normalized_dir: Path, encrypted_dir: Path, encryption_key: str) -> int:
+    """
+    Encrypt each normalized .jsonl file into encrypted_dir.
+    
+    Returns:
+        Number of files encrypted
+    """
+    worker = EncryptionWorker(encrypted_dir, encryption_key)
+    try:
+        for json_file in sorted(normalized_dir.glob("*.jsonl")):
+            worker.put(json_file)
+    finally:
+        encrypted = worker.close()
+    
+    for json_file, encrypted_file in encrypted:
+        print(f"   🔐 {json_file.name} → {encrypted_file.name}")
+    
+    return len(encrypted)
+
+
+class EncryptionWorker:
+    """
+    Thread pool that encrypts .jsonl files as soon as they are queued.
+    
+    Pass put() as normalization()'s on_saved callback so each model file is
+    encrypted while the remaining ones are still being written. Files are
+    encrypted concurrently: AES-GCM runs in OpenSSL (which picks AES-NI /
+    hardware AES by itself) and, like zlib and file I/O, releases the GIL.
+    """
+    
+    MAX_WORKERS = 6  # one per model file
+    
+    def __init__(self, encrypted_dir: Path, encryption_key: str):
+        encrypted_dir.mkdir(parents=True, exist_ok=True)
+        self.encrypted_dir = encrypted_dir
+        self.encryption_key = encryption_key
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS)
+        self._futures = []  # (json_file, future)
+    
+    def put(self, json_file: Path):
+        """Queue a finished file for encryption."""
+        future = self._executor.submit(encrypt_file, json_file, self.encrypted_dir, self.encryption_key)
+        self._futures.append((json_file, future))
+    
+    def close(self) -> List[tuple[Path, Path]]:
+        """
+        Wait for queued files to finish.
+        
+        Returns:
+            (json_file, encrypted_file) pairs, sorted by file name
+        
+        Raises:
+            The first encryption error, if any
+        """
+        self._executor.shutdown(wait=True)
+        return sorted((json_file, future.result()) for json_file, future in self._futures)
+
+
 def process_kobo_file(input_file: Path, output_base: Path, encryption_key: str) -> bool:
     """
     Process a single Kobo file through the complete pipeline.
@@ -35,24 +104,22 @@ def process_kobo_file(input_file: Path, output_base: Path, encryption_key: str)
         print("✅ File validated")
         
         # Step 2: Normalize (Excel → JSON with deduplication)
+        # Step 3 runs alongside: each file is encrypted as soon as it is saved
         print("\n🔄 Step 2: Normalizing data...")
         normalized_dir = output_base / "normalized"
-        normalization(input_file, normalized_dir)
+        worker = EncryptionWorker(output_base / "encrypted", encryption_key)
+        try:
+            normalization(input_file, normalized_dir, on_saved=worker.put)
+        finally:
+            encrypted = worker.close()
         print(f"✅ Normalized data saved")
         
         # Step 3: Encrypt each JSON file with bank-level key
         print("\n🔒 Step 3: Encrypting with bank-level security...")
-        encrypted_dir = output_base / "encrypted"
-        encrypted_dir.mkdir(parents=True, exist_ok=True)
-        
-        encrypted_count = 0
-        for json_file in normalized_dir.glob("*.json"):
-            zip_file = encrypted_dir / f"{json_file.stem}.zip"
-            encryption(json_file, zip_file, encryption_key)
-            print(f"   🔐 {json_file.name} → {zip_file.name}")
-            encrypted_count += 1
+        for json_file, encrypted_file in encrypted:
+            print(f"   🔐 {json_file.name} → {encrypted_file.name}")
         
-        print(f"\n✅ Encrypted {encrypted_count} files with 256-bit AES encryption")
+        print(f"\n✅ Encrypted {len(encrypted)} files with 256-bit AES encryption")
         
         return True
         
@@ -87,10 +154,36 @@ def process_folder(folder_path: Path, output_base: Path, encryption_key: str) ->
     
     print(f"✅ Found {len(valid_files)} valid file(s)")
     
+    if len(valid_files) == 1:
+        return int(process_kobo_file(valid_files[0], output_base, encryption_key))
+    
+    # Reading and sorting each file is independent, so it runs on all cores.
+    # Saving stays in this process, in file order, because every file is
+    # deduplicated against the same persons.jsonl.
+    normalized_dir = output_base / "normalized"
     success_count = 0
-    for file in valid_files:
-        if process_kobo_file(file, output_base, encryption_key):
-            success_count += 1
+    with ProcessPoolExecutor(max_workers=min(len(valid_files), os.cpu_count() or 1)) as executor:
+        futures = [executor.submit(build_records, file) for file in valid_files]
+        for file, future in zip(valid_files, futures):
+            print(f"\n{'='*70}")
+            print(f"Processing: {file.name}")
+            print(f"{'='*70}")
+            try:
+                save_with_deduplication(**future.result(), output_path=normalized_dir)
+                print(f"✅ Normalized data saved")
+                success_count += 1
+            except Exception as e:
+                print(f"\n❌ Error processing file: {e}")
+    
+    if success_count > 0:
+        # Encrypt once, after every file has been merged in
+        print("\n🔒 Encrypting with bank-level security...")
+        try:
+            encrypted_count = encrypt_normalized(normalized_dir, output_base / "encrypted", encryption_key)
+        except Exception as e:
+            print(f"\n❌ Error encrypting files: {e}")
+            return 0
+        print(f"\n✅ Encrypted {encrypted_count} files with 256-bit AES encryption")
     
     return success_count
 
@@ -161,12 +254,12 @@ def main():
             f.write("📦 PACKAGE CONTENTS:\n")
             f.write("-" * 70 + "\n")
             f.write(f"1. Encrypted data files: {OUTPUT_BASE / 'encrypted'}/\n")
-            f.write(f"   - persons.zip\n")
-            f.write(f"   - encounters.zip\n")
-            f.write(f"   - observations.zip\n")
-            f.write(f"   - treatments.zip\n")
-            f.write(f"   - diseases.zip\n")
-            f.write(f"   - medical_records.zip\n\n")
+            f.write(f"   - persons.jsonl.enc\n")
+            f.write(f"   - encounters.jsonl.enc\n")
+            f.write(f"   - observations.jsonl.enc\n")
+            f.write(f"   - treatments.jsonl.enc\n")
+            f.write(f"   - diseases.jsonl.enc\n")
+            f.write(f"   - medical_records.jsonl.enc\n\n")
             f.write(f"2. Parent system interface: {interface_doc.name}\n")
             f.write(f"   - How to access encryption key programmatically\n")
             f.write(f"   - Decryption code examples\n")
@@ -184,15 +277,15 @@ def main():
             f.write("🚀 PARENT SYSTEM WORKFLOW:\n")
             f.write("-" * 70 + "\n")
             f.write("1. Call get_key_for_parent_system() to retrieve encryption key\n")
-            f.write("2. Use key to decrypt ZIP files\n")
-            f.write("3. Load JSON data into database/application\n")
+            f.write("2. Use key to decrypt .enc files (AES-256-GCM)\n")
+            f.write("3. Load JSON Lines (one record per line) into database/application\n")
             f.write("4. Process and display data as needed\n\n")
             
             f.write("🔒 SECURITY NOTES:\n")
             f.write("-" * 70 + "\n")
             f.write("- This system (datacarwash) ONLY encrypts, never decrypts\n")
             f.write("- Encryption key is 256-bit AES strength\n")
-            f.write("- Key is NOT human-readable (base64-encoded random bytes)\n")
+            f.write("- Key is NOT human-readable (hex-encoded random bytes)\n")
             f.write("- .env file must be secured (chmod 600 on Unix systems)\n")
             f.write("- Parent system accesses key via secure Python API\n")
             f.write("- No plain text password files are created\n\n")
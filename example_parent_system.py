@@ -4,8 +4,9 @@ and decrypt files from the datacarwash system.
 """
 
 from pathlib import Path
-import json
-import pyzipper
+import tempfile
+from datacarwash.components.deduplication import load_existing_records
+from datacarwash.components.encryption import decryption
 from datacarwash.components.key_manager import get_key_for_parent_system
 
 
@@ -14,8 +15,8 @@ def decrypt_and_load_data(encrypted_dir: Path, output_dir: Path = None):
     Parent system: Retrieve key and decrypt all data files.
     
     Args:
-        encrypted_dir: Directory with encrypted ZIP files
-        output_dir: Where to save decrypted JSON (optional)
+        encrypted_dir: Directory with encrypted .enc (or legacy ZIP) files
+        output_dir: Where to save decrypted JSON / JSON Lines (optional)
     """
     print("🔓 PARENT SYSTEM - Decryption Process")
     print("="*70)
@@ -31,7 +32,7 @@ def decrypt_and_load_data(encrypted_dir: Path, output_dir: Path = None):
         print("Make sure the datacarwash pipeline has been run first!")
         return
     
-    # Step 2: Decrypt all ZIP files
+    # Step 2: Decrypt all data files
     print("\n🔓 Step 2: Decrypting data files...")
     
     if not encrypted_dir.exists():
@@ -40,35 +41,43 @@ def decrypt_and_load_data(encrypted_dir: Path, output_dir: Path = None):
     
     decrypted_data = {}
     
-    for zip_file in encrypted_dir.glob("*.zip"):
-        print(f"\n   Decrypting: {zip_file.name}")
+    # Streamed AES-GCM files, plus legacy pyzipper archives from older runs.
+    # A stale .zip is only read for models that have no .enc file yet.
+    encrypted_files = sorted(encrypted_dir.glob("*.enc"))
+    current_models = {f.name.split('.')[0] for f in encrypted_files}
+    encrypted_files += [
+        f for f in sorted(encrypted_dir.glob("*.zip"))
+        if f.name.split('.')[0] not in current_models
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        target_dir = output_dir or Path(tmp_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
         
-        try:
-            # Decrypt ZIP file
-            with pyzipper.AESZipFile(zip_file, 'r') as zipf:
-                zipf.setpassword(encryption_key.encode('utf-8'))
-                
-                # Get the JSON filename inside the ZIP
-                json_filename = zip_file.stem + '.json'
+        for encrypted_file in encrypted_files:
+            print(f"\n   Decrypting: {encrypted_file.name}")
+            
+            try:
+                # Get the data filename, e.g. encounters.jsonl.enc -> encounters.jsonl
+                model_name = encrypted_file.name.split('.')[0]
+                if encrypted_file.suffix == '.enc':
+                    json_filename = encrypted_file.stem
+                else:
+                    json_filename = model_name + '.json'
                 
-                # Read and parse JSON
-                json_data = zipf.read(json_filename)
-                data = json.loads(json_data)
+                # Decrypt and parse JSON Lines (legacy archives hold a JSON array)
+                json_file = decryption(encrypted_file, target_dir / json_filename, encryption_key)
+                data = load_existing_records(json_file)
                 
-                decrypted_data[zip_file.stem] = data
+                decrypted_data[model_name] = data
                 
-                print(f"   ✅ Decrypted {len(data)} records from {zip_file.name}")
+                print(f"   ✅ Decrypted {len(data)} records from {encrypted_file.name}")
                 
-                # Optionally save to file
                 if output_dir:
-                    output_dir.mkdir(parents=True, exist_ok=True)
-                    output_file = output_dir / json_filename
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, indent=2, ensure_ascii=False)
-                    print(f"   💾 Saved to: {output_file}")
-                    
-        except Exception as e:
-            print(f"   ❌ Error decrypting {zip_file.name}: {e}")
+                    print(f"   💾 Saved to: {json_file}")
+                
+            except Exception as e:
+                print(f"   ❌ Error decrypting {encrypted_file.name}: {e}")
     
     # Step 3: Summary
     print("\n" + "="*70)
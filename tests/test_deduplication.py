@@ -0,0 +1,87 @@
+"""
+Tests for person deduplication across and within normalization runs.
+"""
+
+import pandas as pd
+from pathlib import Path
+from datacarwash.components.normilization import normalization
+from datacarwash.components.deduplication import deduplicate_persons, load_existing_records, update_person_info
+
+
+def make_export(path: Path) -> Path:
+    """Kobo-style export with repeat visits that fill in each other's gaps."""
+    rows = [
+        # Reg number first, village filled in on a later visit
+        {'patient_name': 'Patient 5', 'age': 45, 'reg_number': 'REG-5', 'village': None},
+        {'patient_name': 'Patient 5', 'age': 45, 'reg_number': 'REG-5', 'village': 'Mulanda'},
+        {'patient_name': 'Patient 5', 'age': 45, 'reg_number': None, 'village': 'Mulanda'},
+        {'patient_name': 'Patient 5', 'age': 45, 'reg_number': None, 'village': None},
+        # Village first, reg number on a later visit
+        {'patient_name': 'Patient 6', 'age': 50, 'reg_number': None, 'village': 'Osukuru'},
+        {'patient_name': 'Patient 6', 'age': 50, 'reg_number': 'REG-6', 'village': 'Osukuru'},
+        {'patient_name': 'Patient 6', 'age': 50, 'reg_number': None, 'village': None},
+        {'patient_name': 'Patient 7', 'age': 61, 'reg_number': 'REG-7', 'village': 'Rubongi'},
+    ]
+    for i, row in enumerate(rows):
+        row['assessment_date'] = f"2025-01-{i + 1:02d}"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return path
+
+
+def test_renormalizing_same_file_keeps_persons(tmp_path):
+    """Running the same export twice must not add persons or lose reg numbers."""
+    export = make_export(tmp_path / "export.csv")
+    output = tmp_path / "normalized"
+
+    normalization(export, output)
+    first = load_existing_records(output / "persons.jsonl")
+    normalization(export, output)
+    second = load_existing_records(output / "persons.jsonl")
+
+    assert len(second) == len(first) == 3
+    registration_numbers = {p['role_data']['registration_number'] for p in second}
+    assert registration_numbers == {'REG-5', 'REG-6', 'REG-7'}
+
+    # Every encounter points at a stored person
+    person_ids = {p['person_id'] for p in second}
+    encounters = load_existing_records(output / "encounters.jsonl")
+    assert len(encounters) == 16
+    assert {e['patient_id'] for e in encounters} <= person_ids
+
+
+def test_update_person_info_keeps_known_role_data():
+    """Empty values never overwrite known ones; enrollment date stays the first visit's."""
+    existing = {'role_data': {'registration_number': 'REG-5', 'enrollment_date': '2025-01-01'}}
+    new = {'role_data': {'registration_number': None, 'enrollment_date': '2025-02-01', 'status': 'active'}}
+
+    assert update_person_info(existing, new, '2025-02-01T00:00:00')
+    assert existing['role_data'] == {
+        'registration_number': 'REG-5',
+        'enrollment_date': '2025-01-01',
+        'status': 'active'
+    }
+
+
+def test_blank_village_does_not_pick_between_namesakes():
+    """A row with no village stays a new person when two known patients share name and age."""
+    existing = [
+        {'person_id': 'A', 'name': 'John Okello', 'age': 40, 'address': {'village': 'Mulanda'}},
+        {'person_id': 'B', 'name': 'John Okello', 'age': 40, 'address': {'village': 'Rubongi'}},
+    ]
+    new = [{'person_id': 'n1', 'name': 'John Okello', 'age': 40, 'address': {'village': None}}]
+
+    unique_persons, id_mapping = deduplicate_persons(new, existing)
+
+    assert id_mapping == {}
+    assert [p['person_id'] for p in unique_persons] == ['n1']
+
+
+def test_blank_village_matches_single_namesake():
+    """With only one known patient of that name and age, the blank-village row merges into it."""
+    existing = [{'person_id': 'A', 'name': 'John Okello', 'age': 40, 'address': {'village': 'Mulanda'}}]
+    new = [{'person_id': 'n1', 'name': 'John Okello', 'age': 40, 'address': {'village': None}}]
+
+    unique_persons, id_mapping = deduplicate_persons(new, existing)
+
+    assert id_mapping == {'n1': 'A'}
+    assert unique_persons == []
@@ -0,0 +1,169 @@
+"""
+Tests for file encryption and the parent system decryption example.
+"""
+
+import errno
+import importlib
+import threading
+import time
+import pytest
+import orjson
+from unittest import mock
+from cryptography.exceptions import InvalidTag
+from datacarwash.components.encryption import encryption, decryption, HEADER_SIZE
+import example_parent_system
+
+
+# The package re-exports encryption(), which shadows the module attribute
+encryption_module = importlib.import_module("datacarwash.components.encryption")
+
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture
+def records_file(tmp_path):
+    """A JSON Lines model file large enough to span several chunks once compressed."""
+    path = tmp_path / "encounters.jsonl"
+    path.write_bytes(b"".join(
+        orjson.dumps({'encounter_id': i, 'notes': f"visit {i}" * 20}) + b"\n"
+        for i in range(20000)
+    ))
+    return path
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip(tmp_path, records_file, compress):
+    """Decrypting an encrypted file restores the original bytes."""
+    encrypted = tmp_path / "encounters.jsonl.enc"
+    encryption(records_file, encrypted, PASSWORD, compress=compress)
+    decrypted = decryption(encrypted, tmp_path / "out.jsonl", PASSWORD)
+    assert decrypted.read_bytes() == records_file.read_bytes()
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_wrong_password_leaves_no_output(tmp_path, records_file, compress):
+    """A wrong password raises InvalidTag and leaves neither output nor .part file."""
+    encrypted = tmp_path / "encounters.jsonl.enc"
+    encryption(records_file, encrypted, PASSWORD, compress=compress)
+    output = tmp_path / "out.jsonl"
+
+    with pytest.raises(InvalidTag):
+        decryption(encrypted, output, "wrong password")
+    assert not output.exists()
+    assert not output.with_name(output.name + '.part').exists()
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_tampered_file_rejected(tmp_path, records_file, compress):
+    """Flipping a single ciphertext byte raises InvalidTag."""
+    encrypted = tmp_path / "encounters.jsonl.enc"
+    encryption(records_file, encrypted, PASSWORD, compress=compress)
+    data = bytearray(encrypted.read_bytes())
+    data[HEADER_SIZE + 10] ^= 0xFF
+    encrypted.write_bytes(bytes(data))
+    output = tmp_path / "out.jsonl"
+
+    with pytest.raises(InvalidTag):
+        decryption(encrypted, output, PASSWORD)
+    assert not output.exists()
+    assert not output.with_name(output.name + '.part').exists()
+
+
+def test_truncated_file_rejected(tmp_path, records_file):
+    """Cutting the tag off, or most of the file, is detected."""
+    encrypted = tmp_path / "encounters.jsonl.enc"
+    encryption(records_file, encrypted, PASSWORD)
+    data = encrypted.read_bytes()
+    output = tmp_path / "out.jsonl"
+
+    encrypted.write_bytes(data[:-5])
+    with pytest.raises(InvalidTag):
+        decryption(encrypted, output, PASSWORD)
+
+    encrypted.write_bytes(data[:HEADER_SIZE + 5])
+    with pytest.raises(ValueError):
+        decryption(encrypted, output, PASSWORD)
+    assert not output.exists()
+
+
+def test_write_error_raises_instead_of_hanging(tmp_path, records_file):
+    """A failing dst.write (e.g. disk full) surfaces as an error and stops the pipeline."""
+    real_open = open
+    real_cipher = encryption_module.Cipher
+
+    class FullDisk:
+        """Accepts the header, then fails like a full disk."""
+        def __init__(self):
+            self.writes = 0
+        def __enter__(self):
+            return self
+        def __exit__(self, *exc):
+            return False
+        def write(self, data):
+            self.writes += 1
+            if self.writes > 1:
+                raise OSError(errno.ENOSPC, "No space left on device")
+
+    class SlowEncryptor:
+        """Slow enough that the reader finishes while the writer is failing."""
+        def __init__(self, encryptor):
+            self.encryptor = encryptor
+        def __getattr__(self, name):
+            return getattr(self.encryptor, name)
+        def update(self, data):
+            time.sleep(0.05)
+            return self.encryptor.update(data)
+
+    def fake_open(path, mode='r', *args, **kwargs):
+        return FullDisk() if 'w' in mode else real_open(path, mode, *args, **kwargs)
+
+    def slow_cipher(*args, **kwargs):
+        cipher = real_cipher(*args, **kwargs)
+        return mock.Mock(encryptor=lambda: SlowEncryptor(cipher.encryptor()))
+
+    errors = []
+
+    def run():
+        try:
+            encryption(records_file, tmp_path / "encounters.jsonl.enc", PASSWORD, compress=False)
+        except OSError as e:
+            errors.append(e)
+
+    with mock.patch.object(encryption_module, 'open', fake_open, create=True), \
+            mock.patch.object(encryption_module, 'Cipher', slow_cipher):
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout=30)
+
+    assert not thread.is_alive(), "encryption() hung after a write error"
+    assert [e.errno for e in errors] == [errno.ENOSPC]
+
+
+def test_legacy_zip_round_trip(tmp_path, records_file):
+    """Archives written with legacy_zip=True still decrypt through decryption()."""
+    archive = tmp_path / "encounters.zip"
+    encryption(records_file, archive, PASSWORD, legacy_zip=True)
+    decrypted = decryption(archive, tmp_path / "out.jsonl", PASSWORD)
+    assert decrypted.read_bytes() == records_file.read_bytes()
+
+
+def test_parent_prefers_enc_over_stale_zip(tmp_path):
+    """A stale legacy .zip must not overwrite the model loaded from its .enc file."""
+    encrypted_dir = tmp_path / "encrypted"
+    encrypted_dir.mkdir()
+    current = tmp_path / "persons.jsonl"
+    current.write_bytes(b'{"person_id": "a"}\n{"person_id": "b"}\n')
+    stale = tmp_path / "persons.json"
+    stale.write_bytes(b'[{"person_id": "a"}]')
+    legacy_only = tmp_path / "diseases.json"
+    legacy_only.write_bytes(b'[{"disease_id": "d"}]')
+
+    encryption(current, encrypted_dir / "persons.jsonl.enc", PASSWORD)
+    encryption(stale, encrypted_dir / "persons.zip", PASSWORD, legacy_zip=True)
+    encryption(legacy_only, encrypted_dir / "diseases.zip", PASSWORD, legacy_zip=True)
+
+    with mock.patch.object(example_parent_system, 'get_key_for_parent_system', return_value=PASSWORD):
+        data = example_parent_system.decrypt_and_load_data(encrypted_dir)
+
+    assert [p['person_id'] for p in data['persons']] == ['a', 'b']
+    assert data['diseases'] == [{'disease_id': 'd'}]
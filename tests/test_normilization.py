@@ -0,0 +1,189 @@
+"""
+Tests for reading exports and building records in the normalization component.
+"""
+
+import uuid
+import pytest
+import pandas as pd
+from datacarwash.components.normilization import _read_csv, _uuid4_batch, build_records, normalization
+from datacarwash.components.deduplication import load_existing_records
+
+
+def test_pyarrow_reader_keeps_text_like_pandas(tmp_path):
+    """Dates, times, signed integers and NA markers come back as pandas reads them."""
+    pytest.importorskip("pyarrow.csv")
+    export = tmp_path / "export.csv"
+    export.write_text(
+        "patient_name,visit_time,assessment_date,seen_at,age,phone,weight,notes\n"
+        "A,08:30,2025-01-01,2025-01-01 08:30,40,+256772123456,61.5,None\n"
+        "B,,2025-01-02,,41,+256701000111,None,ok\n"
+    )
+
+    records = _read_csv(export).astype(object).to_dict('records')
+    expected = pd.read_csv(export).astype(object).to_dict('records')
+
+    assert records[0]['visit_time'] == '08:30'
+    assert records[0]['seen_at'] == '2025-01-01 08:30'
+    assert records[0]['phone'] == 256772123456 and isinstance(records[0]['phone'], int)
+    assert pd.isna(records[0]['notes']) and pd.isna(records[1]['weight'])
+    assert str(records) == str(expected)
+
+
+EXPORT = (
+    "patient_name,age,sex,phone,village,reg_number,assessment_date,diagnosis,summary,next_review,"
+    "seen_by,pulse_rate,bp_systol,bp_diastol,temperature,resp_rate,general_assessment,cachexia,"
+    "jaundice,pallor,body_wasting,loc,orientation,med_name,dose,indication,date_completed,note_physician\n"
+    " Jane Achieng ,34,Female,+256772123456, Mulanda,reg-1,2025-01-01,Cancer of Cervix,Stable on morphine,"
+    "2025-02-01,Dr Amoding,80,120,80,36.6,18,Fair,Yes,,No,,Alert,Oriented,Morphine,5mg,pain,,titrate weekly\n"
+    "Okello,,MALE,,Rubongi,,2025-01-02,,,,,,,,37.2,,Poor,,,,,,Confused,,,,,\n"
+)
+
+STAMPS = {'created_at': '<now>', 'updated_at': '<now>'}
+
+
+def person(person_id, name, age, sex, phone, village, reg_number, enrollment_date):
+    return {
+        'person_id': person_id, 'person_type': 'patient', 'name': name, 'age': age, 'sex': sex,
+        'contact': {'phone_primary': phone, 'phone_secondary': None},
+        'address': {'village': village, 'subcounty': None, 'district': 'tororo', 'country': 'uganda'},
+        'role_data': {'registration_number': reg_number, 'enrollment_date': enrollment_date, 'status': 'active'},
+        'is_active': True, **STAMPS
+    }
+
+
+def encounter(encounter_id, patient_id, date, complaint, summary, next_review, form_data):
+    return {
+        'encounter_id': encounter_id, 'patient_id': patient_id,
+        'encounter_type': 'clinical_assessment', 'encounter_date': date, 'encounter_time': None,
+        'duration_minutes': None, 'staff_id': None, 'location_type': 'clinic', 'location_details': None,
+        'chief_complaint': complaint, 'assessment_summary': summary, 'plan': next_review,
+        'next_visit_date': next_review, 'status': 'completed', 'form_data': form_data, **STAMPS
+    }
+
+
+def observation(observation_id, patient_id, encounter_id, obs_type, category, name, value, date):
+    return {
+        'observation_id': observation_id, 'patient_id': patient_id, 'encounter_id': encounter_id,
+        'observation_type': obs_type, 'observation_category': category, 'observation_name': name,
+        'value': value, 'observation_date': date, 'recorded_by': None, **STAMPS
+    }
+
+
+def mask(records):
+    """Replace generated IDs with 'id-<n>' in order of first appearance, and timestamps with '<now>'."""
+    labels = {}
+
+    def walk(value, key=''):
+        if isinstance(value, dict):
+            return {k: walk(v, k) for k, v in value.items()}
+        if isinstance(value, list):
+            return [walk(v) for v in value]
+        if key in STAMPS:
+            return '<now>'
+        if key.endswith('_id') and isinstance(value, str):
+            return labels.setdefault(value, f"id-{len(labels)}")
+        return value
+
+    return walk(records)
+
+
+def test_build_records_matches_expected(tmp_path):
+    """Missing values, categorical columns, vitals, exam findings, medication and summary rows."""
+    export = tmp_path / "export.csv"
+    export.write_text(EXPORT)
+
+    records = build_records(export)
+
+    # Timestamps are one value for the whole batch
+    assert len({r[k] for rs in records.values() for r in rs for k in STAMPS}) == 1
+
+    p1, p2, e1, e2 = 'id-0', 'id-1', 'id-2', 'id-3'
+    assert mask(records) == {
+        'persons': [
+            person(p1, 'jane achieng', 34, 'female', 256772123456.0, 'mulanda', 'REG-1', '2025-01-01'),
+            person(p2, 'okello', None, 'male', None, 'rubongi', None, '2025-01-02'),
+        ],
+        'encounters': [
+            encounter(e1, p1, '2025-01-01', 'Cancer of Cervix', 'Stable on morphine', '2025-02-01', {
+                'patient_name': ' Jane Achieng ', 'age': 34.0, 'sex': 'Female', 'phone': 256772123456.0,
+                'village': ' Mulanda', 'reg_number': 'reg-1', 'assessment_date': '2025-01-01',
+                'diagnosis': 'Cancer of Cervix', 'summary': 'Stable on morphine', 'next_review': '2025-02-01',
+                'seen_by': 'Dr Amoding', 'pulse_rate': 80.0, 'bp_systol': 120.0, 'bp_diastol': 80.0,
+                'temperature': 36.6, 'resp_rate': 18.0, 'general_assessment': 'Fair', 'cachexia': 'Yes',
+                'pallor': 'No', 'loc': 'Alert', 'orientation': 'Oriented', 'med_name': 'Morphine',
+                'dose': '5mg', 'indication': 'pain', 'note_physician': 'titrate weekly'
+            }),
+            encounter(e2, p2, '2025-01-02', None, None, None, {
+                'patient_name': 'Okello', 'sex': 'MALE', 'village': 'Rubongi', 'assessment_date': '2025-01-02',
+                'temperature': 37.2, 'general_assessment': 'Poor', 'orientation': 'Confused'
+            }),
+        ],
+        # One row's observations after another, as the row-by-row loop wrote them
+        'observations': [
+            observation('id-4', p1, e1, 'vital_sign', 'cardiovascular', 'vital_signs', {
+                'heart_rate': 80, 'blood_pressure_systolic': 120, 'blood_pressure_diastolic': 80,
+                'temperature': 36.6, 'respiratory_rate': 18
+            }, '2025-01-01'),
+            observation('id-5', p1, e1, 'physical_exam_finding', 'general', 'general_assessment', {'finding': 'Fair'}, '2025-01-01'),
+            observation('id-6', p1, e1, 'physical_exam_finding', 'general', 'cachexia', {'finding': 'Yes'}, '2025-01-01'),
+            observation('id-7', p1, e1, 'physical_exam_finding', 'general', 'pallor', {'finding': 'No'}, '2025-01-01'),
+            observation('id-8', p1, e1, 'assessment_score', 'neurological', 'level_of_consciousness', {'level': 'Alert'}, '2025-01-01'),
+            observation('id-9', p1, e1, 'assessment_score', 'neurological', 'orientation', {'status': 'Oriented'}, '2025-01-01'),
+            observation('id-10', p2, e2, 'vital_sign', 'cardiovascular', 'vital_signs', {'temperature': 37.2}, '2025-01-02'),
+            observation('id-11', p2, e2, 'physical_exam_finding', 'general', 'general_assessment', {'finding': 'Poor'}, '2025-01-02'),
+            observation('id-12', p2, e2, 'assessment_score', 'neurological', 'orientation', {'status': 'Confused'}, '2025-01-02'),
+        ],
+        'treatments': [{
+            'treatment_id': 'id-13', 'patient_id': p1, 'encounter_id': e1, 'treatment_type': 'medication',
+            'treatment_name': 'Morphine', 'treatment_category': 'symptom_control',
+            'details': {'generic_name': 'Morphine', 'dosage': '5mg', 'indication': 'pain'},
+            'start_date': '2025-01-01', 'end_date': None, 'status': 'active', 'notes': 'titrate weekly', **STAMPS
+        }],
+        'diseases': [{
+            'disease_id': 'id-14', 'patient_id': p1, 'medical_record_id': None, 'encounter_id': e1,
+            'disease_category': 'unspecified', 'disease_name': 'cancer of cervix', 'icd10_code': None,
+            'disease_details': {}, 'diagnosis_date': '2025-01-01', 'diagnosed_by': None, 'status': 'active',
+            'severity': None, 'prognosis': None, 'notes': None, **STAMPS
+        }],
+        'medical_records': [{
+            'record_id': 'id-15', 'patient_id': p1, 'encounter_id': e1, 'record_type': 'clinical_note',
+            'record_date': '2025-01-01', 'record_time': None, 'title': 'Assessment Summary',
+            'summary': 'Stable on morphine', 'content': {'note': 'Stable on morphine', 'seen_by': 'Dr Amoding'},
+            'author_id': None, 'status': 'final', **STAMPS
+        }],
+    }
+
+
+def test_uuid4_batch_is_valid_uuid4():
+    """Batch IDs parse as distinct version 4 (RFC 4122) UUIDs in canonical form."""
+    ids = _uuid4_batch(1000)
+
+    assert len(set(ids)) == 1000
+    for value in ids:
+        parsed = uuid.UUID(value)
+        assert parsed.version == 4
+        assert parsed.variant == uuid.RFC_4122
+        assert str(parsed) == value
+    assert _uuid4_batch(0) == []
+
+
+def test_numeric_header_and_wide_integers_are_saved(tmp_path, monkeypatch):
+    """An int column label and a 20-digit number are written, and so are all six files."""
+    frame = pd.DataFrame({
+        'patient_name': ['Jane Achieng'],
+        'assessment_date': ['2025-01-01'],
+        'summary': ['Stable'],
+        2024: [1],
+        'national_id': [99999999999999999999],
+    })
+    monkeypatch.setattr(pd, 'read_excel', lambda *args, **kwargs: frame.copy())
+    output = tmp_path / "normalized"
+
+    normalization(tmp_path / "export.xlsx", output)
+
+    for model in ('persons', 'encounters', 'observations', 'treatments', 'diseases', 'medical_records'):
+        assert (output / f"{model}.jsonl").exists()
+    [encounter] = load_existing_records(output / "encounters.jsonl")
+    assert encounter['form_data']['2024'] == 1
+    assert encounter['form_data']['national_id'] == '99999999999999999999'
+    assert len(load_existing_records(output / "medical_records.jsonl")) == 1